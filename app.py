@@ -1,25 +1,14 @@
 # app.py
-import pandas as pd
-import numpy as np
 import streamlit as st
-import requests
-from io import StringIO
 import plotly.express as px
+import plotly.graph_objects as go
+
+from data import YEAR_STEP, get_df, get_year_views
 
 # ---------------------------
 # 1. Load and cache data
 # ---------------------------
-@st.cache_data
-def load_data():
-    url = "https://raw.githubusercontent.com/owid/co2-data/master/owid-co2-data.csv"
-    r = requests.get(url)
-    r.raise_for_status()
-    df = pd.read_csv(StringIO(r.text))
-    df = df.fillna(0)
-    df['gdp_per_capita'] = np.where(df['population'] != 0, df['gdp'] / df['population'], 0)
-    return df
-
-df = load_data()
+df = get_df()
 
 # ---------------------------
 # 2. Sidebar filters
@@ -31,12 +20,11 @@ year = st.sidebar.slider(
     "Year",
     min_value=int(df['year'].min()),
     max_value=int(df['year'].max()),
-    step=5,
+    step=YEAR_STEP,
     value=2010
 )
 
-continents = ['World', 'Asia', 'Oceania', 'Europe', 'Africa', 'North America', 'South America', 'Antarctica']
-continents_excl_world = ['Asia', 'Oceania', 'Europe', 'Africa', 'North America', 'South America', 'Antarctica']
+ts_view, scatter_view, bar_view, choro_view = get_year_views(year)
 
 # ---------------------------
 # 3. CO2 over time by continent
@@ -60,12 +48,7 @@ with col1:
 # Convert pretty label → actual dataframe column
 yaxis_CO2 = co2_label_map[pretty_CO2]
 
-CO2_pipeline = (
-    df[(df['year'] <= year) & (df['country'].isin(continents))]
-      .groupby(['country', 'year'])[yaxis_CO2].mean()
-      .reset_index()
-      .sort_values('year')
-)
+CO2_pipeline = ts_view[['country', 'year', yaxis_CO2]]
 
 fig_CO2 = px.line(
     CO2_pipeline,
@@ -82,11 +65,7 @@ st.plotly_chart(fig_CO2, use_container_width=True)
 # ---------------------------
 st.subheader(f"CO₂ vs GDP per Capita ({year})")
 
-CO2_vs_gdp_pipeline = (
-    df[(df['year'] == year) & (~df['country'].isin(continents))]
-      .groupby(['country', 'gdp_per_capita'])['co2'].mean()
-      .reset_index()
-)
+CO2_vs_gdp_pipeline = scatter_view
 
 fig_scatter = px.scatter(
     CO2_vs_gdp_pipeline,
@@ -94,10 +73,10 @@ fig_scatter = px.scatter(
     y='co2',
     color='country',
     hover_name='country',
-    size=np.ones(len(CO2_vs_gdp_pipeline)) * 10,
     title=f"CO₂ vs GDP per Capita ({year})",
+    render_mode='webgl',
     labels={'gdp_per_capita':'GDP per Capita', 'CO2':'CO₂ Emissions'}
-)
+).update_traces(marker_size=20)  # what px drew for the old constant size= (size_max=20)
 st.plotly_chart(fig_scatter, use_container_width=True)
 
 # ---------------------------
@@ -127,9 +106,7 @@ pretty_choice = st.radio(
 yaxis_CO2_source = source_label_map[pretty_choice]
 
 CO2_source_pipeline = (
-    df[(df['year'] == year) & (df['country'].isin(continents_excl_world))]
-      .groupby(['country'])[yaxis_CO2_source].sum()
-      .reset_index()
+    bar_view[['country', yaxis_CO2_source]]
       .sort_values(yaxis_CO2_source, ascending=False)
 )
 
@@ -151,68 +128,48 @@ st.plotly_chart(fig_bar, use_container_width=True)
 st.subheader("CO₂ Data Table")
 st.dataframe(CO2_pipeline)
 
-@st.cache_data
-def load_country_coords():
-    url = "https://raw.githubusercontent.com/johan/world.geo.json/master/countries.geo.json"
-    geojson = requests.get(url).json()
-
-    rows = []
-    for feat in geojson["features"]:
-        props = feat["properties"]
-        geometry = feat["geometry"]
-
-        # Extract centroid of polygon
-        if geometry["type"] == "Polygon":
-            coords = np.array(geometry["coordinates"][0])
-        else:  # MultiPolygon
-            coords = np.array(geometry["coordinates"][0][0])
-
-        lon = coords[:, 0].mean()
-        lat = coords[:, 1].mean()
-
-        rows.append({
-            "country": props["name"],
-            "latitude": lat,
-            "longitude": lon,
-        })
-
-    return pd.DataFrame(rows)
-
-
-coords = load_country_coords()
-df = df.merge(coords, on="country", how="left")
-
 st.subheader(f"Global CO₂ Heatmap ({year})")
 
-df_3d = df[df["year"] == year].copy()
+# Layout and styling are built once and shared; each rerun copies the
+# template and only swaps in the trace data for the selected year.
+@st.cache_resource
+def globe_template():
+    fig = go.Figure(go.Choropleth(
+        locationmode="ISO-3",      # must be ISO country codes (OWID already has this)
+        colorscale="Reds",
+        zmin=0,
+        zmax=17000,
+        hovertemplate="<b>%{text}</b><br>iso_code=%{location}<br>co2=%{z}<extra></extra>",
+        colorbar=dict(
+            title="CO₂ (Mt)",
+            thicknessmode="pixels", thickness=15,
+            lenmode="fraction", len=0.75
+        )
+    ))
+
+    fig.update_geos(
+        projection_type="orthographic", # <-- Makes it a globe
+        showcoastlines=True,
+        coastlinecolor="black",
+        showland=True,
+        landcolor="rgb(230,230,230)",
+        showocean=True,
+        oceancolor="rgb(180,220,250)",
+    )
 
-fig_globe = px.choropleth(
-    df_3d,
-    locations="iso_code",      # must be ISO country codes (OWID already has this)
-    color="co2",               # heatmap variable
-    hover_name="country",
-    projection="orthographic", # <-- Makes it a globe
-    color_continuous_scale="Reds",
-    range_color=(0, 17000)
-)
+    fig.update_layout(
+        height=700,
+        margin=dict(l=0, r=0, t=40, b=0),
+    )
+    return fig
 
-fig_globe.update_geos(
-    showcoastlines=True,
-    coastlinecolor="black",
-    showland=True,
-    landcolor="rgb(230,230,230)",
-    showocean=True,
-    oceancolor="rgb(180,220,250)",
-)
+df_3d = choro_view
 
-fig_globe.update_layout(
-    height=700,
-    margin=dict(l=0, r=0, t=40, b=0),
-    coloraxis_colorbar=dict(
-        title="CO₂ (Mt)",
-        thicknessmode="pixels", thickness=15,
-        lenmode="fraction", len=0.75
-    )
+fig_globe = go.Figure(globe_template())
+fig_globe.update_traces(
+    locations=df_3d["iso_code"],
+    z=df_3d["co2"],               # heatmap variable
+    text=df_3d["country"],
 )
 
 st.plotly_chart(fig_globe, use_container_width=True)
@@ -0,0 +1,223 @@
+# data.py
+# Data loading and precomputed aggregates shared by the dashboard scripts.
+import os
+import re
+import tempfile
+from itertools import chain
+from pathlib import Path
+import pandas as pd
+import numpy as np
+import orjson
+import streamlit as st
+import requests
+
+CO2_DATA_URL = "https://raw.githubusercontent.com/owid/co2-data/master/owid-co2-data.csv"
+CACHE_DIR = Path.home() / ".cache" / "precip_project"
+
+# Only the columns the dashboard reads are kept from the ~70 in the CSV
+USECOLS = ['country', 'year', 'co2', 'co2_per_capita', 'coal_co2', 'oil_co2', 'gas_co2',
+           'gdp', 'population', 'iso_code']
+
+# The dashboard's year slider moves in steps of this size
+YEAR_STEP = 5
+
+continents = ['World', 'Asia', 'Oceania', 'Europe', 'Africa', 'North America', 'South America', 'Antarctica']
+continents_excl_world = ['Asia', 'Oceania', 'Europe', 'Africa', 'North America', 'South America', 'Antarctica']
+
+def read_cached(path):
+    # A truncated or otherwise unreadable cache file is treated as a miss
+    try:
+        return pd.read_parquet(path, engine="pyarrow", columns=USECOLS)
+    except (OSError, ValueError):
+        return None
+
+def write_cached(df, path):
+    # Write to a temp file and rename it into place so a killed process never
+    # leaves a partial file under the real name; older ETags are then dropped.
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, prefix=".owid_", suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp, engine="pyarrow", compression="zstd")
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    for stale in CACHE_DIR.glob("owid_*.parquet"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+def fetch_raw_data(url=CO2_DATA_URL):
+    # Parsed CSV is kept on disk as Parquet, keyed by the server's ETag,
+    # so cold restarts skip both the download and the text parse.
+    try:
+        head = requests.head(url)
+        head.raise_for_status()
+    except requests.RequestException:
+        # Server unreachable: serve the newest readable cached copy, if any
+        cached = sorted(CACHE_DIR.glob("owid_*.parquet"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for path in cached:
+            df = read_cached(path)
+            if df is not None:
+                return df
+        raise
+    etag = re.sub(r"[^0-9A-Za-z]", "", head.headers.get("ETag", ""))
+    path = CACHE_DIR / f"owid_{etag}.parquet"
+    if etag and path.exists():
+        df = read_cached(path)
+        if df is not None:
+            return df
+
+    # The response body is streamed into the parser rather than buffered whole.
+    # Arrow's multithreaded reader does the parse; columns stay numpy-backed
+    # because the filters below work on categorical codes and numpy masks.
+    with requests.get(url, stream=True) as r:
+        r.raise_for_status()
+        r.raw.decode_content = True
+        df = pd.read_csv(
+            r.raw,
+            engine="pyarrow",
+            usecols=USECOLS,
+            dtype={'country': 'category', 'iso_code': 'category', 'year': 'int16'},
+        )
+    if etag:
+        write_cached(df, path)
+    return df
+
+def category_codes(series, values):
+    codes = series.cat.categories.get_indexer(values)
+    return codes[codes >= 0]
+
+@st.cache_data
+def get_df():
+    df = fetch_raw_data()
+    num_cols = df.select_dtypes('number').columns
+    df[num_cols] = df[num_cols].fillna(0)
+    # float32/int16 hold the OWID values comfortably at half the bytes per scan
+    floats = df.select_dtypes('float64').columns
+    df[floats] = df[floats].astype('float32')
+    df['year'] = df['year'].astype('int16')
+    df['country'] = df['country'].astype('category')
+    # Rows stay ordered by (country, year) so aggregations see sorted keys
+    df.sort_values(['country', 'year'], inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    # Membership flags are computed once here and reused by every filter;
+    # comparing category codes keeps the test on integers rather than strings
+    country_codes = df['country'].cat.codes.to_numpy()
+    df['_is_continent'] = np.isin(country_codes, category_codes(df['country'], continents))
+    df['_is_continent_no_world'] = np.isin(country_codes, category_codes(df['country'], continents_excl_world))
+    gdp = df['gdp'].to_numpy()
+    pop = df['population'].to_numpy()
+    gdp_per_capita = np.zeros(len(df), dtype=np.float32)
+    np.divide(gdp, pop, out=gdp_per_capita, where=pop != 0)
+    df['gdp_per_capita'] = gdp_per_capita
+    return df
+
+# The parsed GeoJSON is read-only and large, so it is shared by reference
+# rather than pickled through st.cache_data.
+@st.cache_resource
+def load_geojson():
+    url = "https://raw.githubusercontent.com/johan/world.geo.json/master/countries.geo.json"
+    r = requests.get(url)
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
+# Country centroids are only needed for lat/lon views; the choropleth keys
+# on iso_code, so this is not called on the normal render path.
+@st.cache_data
+def load_country_coords():
+    geojson = load_geojson()
+
+    names, rings = [], []
+    for feat in geojson["features"]:
+        geometry = feat["geometry"]
+
+        # First ring of the polygon (or of the first part of a MultiPolygon)
+        if geometry["type"] == "Polygon":
+            rings.append(geometry["coordinates"][0])
+        else:  # MultiPolygon
+            rings.append(geometry["coordinates"][0][0])
+        names.append(feat["properties"]["name"])
+
+    # One flat vertex array plus offsets gives every centroid in a single reduction
+    lengths = np.fromiter(map(len, rings), dtype=np.intp, count=len(rings))
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    all_pts = np.array(list(chain.from_iterable(rings)), dtype=np.float64)[:, :2]
+    centroids = np.add.reduceat(all_pts, offsets, axis=0) / lengths[:, None]
+
+    return pd.DataFrame({
+        "country": names,
+        "latitude": centroids[:, 1],
+        "longitude": centroids[:, 0],
+    })
+
+def country_year_means(df, cols):
+    # Mean per (year, country) via bincount over a dense year x country grid;
+    # only cells that have rows are kept, in sorted (year, country) order.
+    codes, countries = pd.factorize(df['country'], sort=True)
+    years = df['year'].to_numpy()
+    year_min = int(years.min())
+    n_years = int(years.max()) - year_min + 1
+    cells = (years - year_min).astype(np.intp) * len(countries) + codes
+    n_cells = len(countries) * n_years
+
+    counts = np.bincount(cells, minlength=n_cells)
+    present = counts > 0
+    means = {
+        col: np.bincount(cells, weights=df[col].to_numpy(), minlength=n_cells)[present] / counts[present]
+        for col in cols
+    }
+    index = pd.MultiIndex.from_product(
+        [np.arange(year_min, year_min + n_years, dtype=years.dtype), countries],
+        names=['year', 'country'],
+    )[present]
+    return pd.DataFrame(means, index=index)
+
+@st.cache_data
+def load_aggregates():
+    # Slider-independent aggregates, indexed by year first; each rerun only slices them
+    df = get_df()
+    is_continent = df['_is_continent'].to_numpy()
+    full_ts = country_year_means(df.iloc[is_continent], ['co2', 'co2_per_capita'])
+    full_scatter = (
+        df.iloc[~is_continent]
+          .groupby(['year', 'country', 'gdp_per_capita'], observed=True)['co2'].mean()
+    )
+    full_sources = (
+        df.iloc[df['_is_continent_no_world'].to_numpy()]
+          .pivot_table(index=['year', 'country'], values=['coal_co2', 'oil_co2', 'gas_co2'],
+                       aggfunc='sum', observed=True)
+    )
+    return full_ts, full_scatter, full_sources
+
+def rows_for_year(agg, year):
+    # agg is indexed by year first; a year with no rows gives an empty result
+    if year in agg.index:
+        return agg.loc[year]
+    return agg.iloc[:0].droplevel('year')
+
+def build_year_views(year, df, full_ts, full_scatter, full_sources):
+    # Frames for one slider position: timeline, scatter, source bar, choropleth
+    # full_ts is year-major, so the cumulative slice is already in year order
+    ts = full_ts.loc[:year].reset_index()
+    scatter = rows_for_year(full_scatter, year).reset_index()
+    bar = rows_for_year(full_sources, year).reset_index()
+    choro = df.loc[df['year'].to_numpy() == year, ['iso_code', 'co2', 'country']]
+    return ts, scatter, bar, choro
+
+@st.cache_resource
+def precompute_year_views():
+    # The slider only ever lands on this grid, so each rerun is a dict lookup.
+    # The frames are shared across sessions and must not be modified in place.
+    df = get_df()
+    full_ts, full_scatter, full_sources = load_aggregates()
+    years = range(int(df['year'].min()), int(df['year'].max()) + 1, YEAR_STEP)
+    return {y: build_year_views(y, df, full_ts, full_scatter, full_sources) for y in years}
+
+def get_year_views(year):
+    views = precompute_year_views()
+    if year in views:
+        return views[year]
+    # Years off the precomputed grid (e.g. the latest year past the last step)
+    # are built on demand rather than failing the lookup
+    return build_year_views(year, get_df(), *load_aggregates())